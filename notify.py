@@ -1,237 +1,577 @@
-import requests
-from datetime import datetime, timedelta
-import json
-import time
-import os
-
-# --- ⬇️ ฟังก์ชันใหม่สำหรับส่ง Discord Webhook ⬇️ ---
-def send_discord_webhook(message, webhook_url):
-    """
-    Sends a message to a Discord channel using a Webhook.
-    """
-    # Discord รับข้อมูลเป็น JSON payload
-    # "content" คือข้อความ
-    # "username" คือชื่อบอทที่จะแสดง
-    data = {
-        "content": message,
-        "username": "Slot Bot 🤖"
-    }
-    
-    try:
-        # ใช้ json=data เพื่อให้ requests ส่ง Content-Type: application/json
-        response = requests.post(webhook_url, json=data)
-        response.raise_for_status()
-        print(f"    🔔 Discord: Message sent successfully!")
-    except requests.exceptions.RequestException as e:
-        print(f"    🔥 Discord Webhook Error: {e}")
-        if hasattr(e, 'response') and e.response is not None and e.response.status_code == 404:
-            print("    🔥 HINT: Webhook URL อาจจะไม่ถูกต้องหรือถูกลบไปแล้ว")
-# --- ⬆️ สิ้นสุดฟังก์ชัน Discord ⬆️ ---
-
-def load_notified_dates(filename="notified_dates.json"):
-    """
-    โหลดรายการวันที่ที่แจ้งเตือนแล้วจากไฟล์ JSON
-    """
-    try:
-        if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return set(data.get('notified_dates', []))
-        return set()
-    except Exception as e:
-        print(f"⚠️ Error loading notified dates: {e}")
-        return set()
-
-def save_notified_dates(notified_dates, filename="notified_dates.json"):
-    """
-    บันทึกรายการวันที่ที่แจ้งเตือนแล้วลงไฟล์ JSON
-    """
-    try:
-        data = {
-            "last_updated": datetime.now().isoformat(),
-            "notified_dates": list(notified_dates)
-        }
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        print(f"💾 Notified dates saved to {filename}")
-    except Exception as e:
-        print(f"⚠️ Error saving notified dates: {e}")
-
-def check_availability(start_date, end_date, discord_webhook_url, notified_dates, skip_dates=None):
-    """
-    Check availability from API for date range and send Discord notification
-    if a new available date is found.
-    
-    Args:
-        start_date: Starting date (YYYY-MM-DD)
-        end_date: Ending date (YYYY-MM-DD)
-        discord_webhook_url: Discord Webhook URL
-        notified_dates: A set of dates that have already been notified. 
-                        This set will be modified in-place.
-        skip_dates: A set of dates to skip checking (YYYY-MM-DD format)
-    
-    Returns:
-        A list of all currently available dates (for saving to JSON).
-    """
-    if skip_dates is None:
-        skip_dates = set()
-    
-    base_url = "https://q.wildlifesanctuaryfca16.com/api/v1/bookings/availability"
-    
-    current_date = datetime.strptime(start_date, "%Y-%m-%d")
-    end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
-    
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔍 Checking from {start_date} to {end_date}...")
-    if skip_dates:
-        print(f"    ⏭️ Skipping dates: {sorted(skip_dates)}")
-    
-    all_available_dates_this_run = []
-    new_dates_found_count = 0
-    
-    while current_date <= end_date_obj:
-        date_str = current_date.strftime("%Y-%m-%d")
-        
-        # ข้ามวันที่ที่ระบุไว้ใน skip_dates
-        if date_str in skip_dates:
-            print(f"    ⏭️ {date_str} - SKIPPED (in skip list)")
-            current_date += timedelta(days=1)
-            continue
-        
-        try:
-            response = requests.get(f"{base_url}?date={date_str}")
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("success") and data.get("data"):
-                booking_data = data["data"]
-                available = booking_data.get("available", 0)
-                capacity = booking_data.get("capacity", 0)
-                
-                if available > 0:
-                    all_available_dates_this_run.append({
-                        "date": date_str,
-                        "available": available,
-                        "capacity": capacity,
-                    })
-
-                    if date_str not in notified_dates:
-                        print(f"    🎉 NEW SLOT FOUND! {date_str} - {available} slots")
-                        
-                        # สร้างข้อความสำหรับ Discord (รองรับ Markdown)
-                        message = (
-                            f"@everyone ## 🚨 พบช่องว่างใหม่! 🚨\n"
-                            f"> **วันที่: {date_str}**\n"
-                            f"> **จำนวนที่ว่าง: {available} / {capacity}**\n\n"
-                            f"รีบไปจองเลย! https://q.wildlifesanctuaryfca16.com/"
-                        )
-                        
-                        # ส่ง Discord
-                        send_discord_webhook(message, discord_webhook_url)
-                        
-                        notified_dates.add(date_str)
-                        new_dates_found_count += 1
-                    else:
-                        print(f"    ✅ {date_str} - Still available: {available} (Already notified)")
-
-                else:
-                    print(f"    ❌ {date_str} - FULL ({booking_data.get('used', 0)}/{capacity})")
-                    if date_str in notified_dates:
-                        notified_dates.remove(date_str)
-                        print(f"    ℹ️ {date_str} is now full. Removed from notified list.")
-
-            else:
-                print(f"    ⚠️  {date_str} - No data available")
-                
-        except requests.exceptions.RequestException as e:
-            print(f"    ❌ {date_str} - Error: {e}")
-        
-        current_date += timedelta(days=1)
-        time.sleep(0.5)
-    
-    if new_dates_found_count > 0:
-        print(f"✨ Found and notified {new_dates_found_count} new dates in this run.")
-    else:
-        print("😔 No *new* available dates found in this run.")
-    
-    return all_available_dates_this_run
-
-# --- ⬇️ ส่วนหลักของการรัน ⬇️ ---
-if __name__ == "__main__":
-    
-    # ==========================================================
-    # 🔐 ใช้ Environment Variable สำหรับ Webhook URL (สำหรับ GitHub Actions)
-    # ใน GitHub Actions จะตั้งค่าเป็น Secret
-    DISCORD_WEBHOOK_URL = os.getenv('DISCORD_WEBHOOK_URL', 'https://discord.com/api/webhooks/1436424986675122298/wJpkFF-6Wve2Awut51sFL7XmFqY0vTmIiHRjQ1PgJ9ZDrEhWat1RK8F78EfQuKEzNZKN')
-    # ==========================================================
-    
-    # ==========================================================
-    # 📅 วันที่ที่ต้องการข้าม (ไม่ต้องการตรวจสอบ)
-    # เพิ่มวันที่ในรูปแบบ "YYYY-MM-DD" ลงในลิสต์นี้
-    SKIP_DATES = {
-        "2025-11-19",  # วันที่ไม่สะดวก
-        "2025-11-26",
-        "2025-12-03",
-        "2025-12-10",
-        "2025-12-17",
-        "2025-12-24",
-        "2025-12-31",
-        "2026-01-07",
-        "2026-01-14",
-        "2026-01-21",
-        "2026-01-28",
-        "2026-02-04",
-        "2026-02-11",
-        "2026-02-13",
-        "2026-02-14",
-        "2026-02-15"
-    }
-    # ==========================================================
-    
-    if DISCORD_WEBHOOK_URL == "YOUR_WEBHOOK_URL_HERE" or not DISCORD_WEBHOOK_URL.startswith("https://discord.com/api/webhooks/"):
-        print("="*80)
-        print("🔥🔥🔥 ข้อผิดพลาด: กรุณาใส่ DISCORD_WEBHOOK_URL ของคุณในโค้ดก่อนรันสคริปต์")
-        print("="*80)
-        exit(1)
-    
-    # โหลดรายการวันที่ที่แจ้งเตือนแล้ว
-    notified_dates = load_notified_dates()
-    
-    print("🚀 Starting availability check...")
-    print(f"Webhook URL: ...{DISCORD_WEBHOOK_URL[-20:]}")
-    if SKIP_DATES:
-        print(f"📅 Will skip these dates: {sorted(SKIP_DATES)}")
-    
-    try:
-        start_date = "2025-11-15"
-        end_date = "2026-02-15"
-        
-        available = check_availability(
-            start_date, 
-            end_date, 
-            DISCORD_WEBHOOK_URL, 
-            notified_dates,
-            SKIP_DATES
-        )
-        
-        # บันทึกรายการวันที่แจ้งเตือนแล้ว
-        save_notified_dates(notified_dates)
-        
-        # บันทึกผลลัพธ์การตรวจสอบ
-        with open("available_dates.json", "w", encoding="utf-8") as f:
-            json.dump({
-                "checked_at": datetime.now().isoformat(),
-                "date_range": {
-                    "start": start_date,
-                    "end": end_date
-                },
-                "skip_dates": list(SKIP_DATES),
-                "available_dates_now": available,
-                "total_notified_dates": len(notified_dates)
-            }, f, indent=2, ensure_ascii=False)
-        
-        print(f"💾 Results updated to available_dates.json")
-        print("✅ Check completed successfully!")
-        
-    except Exception as e:
-        print(f"😱 An unexpected error occurred: {e}")
+# หมายเหตุ: library ฝั่ง network (requests, aiohttp, tenacity, aiolimiter)
+# import แบบ lazy ในฟังก์ชันที่ใช้ — แค่ `import notify` (docs, test collector,
+# static analyzer) ไม่ต้องจ่ายค่า import ssl/yarl/multidict
+import asyncio
+import orjson
+from datetime import date, datetime, timedelta
+import logging
+import os
+import re
+import signal
+import time
+
+logger = logging.getLogger("booking-notify")
+
+# รูปแบบ Discord webhook URL ที่ถูกต้อง (รองรับ canary/ptb และโดเมน discordapp เก่า)
+_WEBHOOK_RE = re.compile(r"^https://(?:canary\.|ptb\.)?discord(?:app)?\.com/api/webhooks/\d+/[A-Za-z0-9_-]+/?$")
+
+# อายุของ cache ต่อวัน (วินาที) — ภายในช่วงนี้จะใช้ผลเดิมแทนการยิง API ซ้ำ
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL", "120"))
+
+# วันที่ "ว่างและแจ้งไปแล้ว" ไม่มีทางแจ้งซ้ำ — เช็คถี่น้อยลง (default = 10 เท่าของ TTL)
+NOTIFIED_RECHECK_SECONDS = int(os.getenv("NOTIFIED_RECHECK", str(10 * CACHE_TTL_SECONDS)))
+
+# จำนวน request พร้อมกันสูงสุด (กันโดน rate limit จาก API)
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "8"))
+
+# เพดานอัตรายิง request ต่อวินาที (token bucket)
+REQS_PER_SEC = int(os.getenv("REQS_PER_SEC", "5"))
+
+# > 0 = รันวนต่อเนื่องใน process เดียว (เว้นช่วงกี่วินาทีต่อรอบ), 0 = รันรอบเดียวแล้วจบ (เหมาะกับ cron)
+POLL_INTERVAL_SECONDS = int(os.getenv("POLL_INTERVAL", "0"))
+
+# Session เดียวใช้ร่วมกันทั้งสคริปต์ — keep-alive ทำให้ไม่ต้อง handshake TCP+TLS ใหม่ทุกครั้ง
+# (สร้างตอนใช้ครั้งแรก จะได้ไม่ต้อง import requests ตั้งแต่ตอน import module)
+_SESSION = None
+
+def _get_session():
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        _SESSION = requests.Session()
+        _SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+    return _SESSION
+
+# --- ⬇️ ฟังก์ชันใหม่สำหรับส่ง Discord Webhook ⬇️ ---
+def _post_webhook(data, webhook_url):
+    """
+    POST ไปที่ webhook พร้อม retry — ถ้าโดน 429 จะรอตาม retry_after ก่อนลองใหม่
+    """
+    import requests
+    from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+    @retry(
+        retry=retry_if_exception_type(requests.exceptions.RequestException),
+        wait=wait_random_exponential(multiplier=0.5, max=30),
+        stop=stop_after_attempt(8),
+        reraise=True,
+    )
+    def post_once():
+        response = _get_session().post(webhook_url, json=data, timeout=10)
+        if response.status_code == 429:
+            retry_after = response.json().get("retry_after", 1)
+            time.sleep(float(retry_after))
+        response.raise_for_status()
+        return response
+
+    return post_once()
+
+def send_discord_webhook(new_slots, webhook_url):
+    """
+    Sends one combined message for all newly-found slots to Discord.
+
+    new_slots: list of (date_str, available, capacity) tuples.
+    """
+    # Discord รับข้อมูลเป็น JSON payload — รวมทุกวันใหม่เป็น embed เดียว
+    # (สูงสุด 10 fields ต่อ embed และ 10 embeds ต่อข้อความ ตามลิมิตของ Discord)
+    fields = [
+        {"name": date_str, "value": f"จำนวนที่ว่าง: {available} / {capacity}"}
+        for date_str, available, capacity in new_slots
+    ]
+    embeds = [
+        {"title": "🚨 พบช่องว่างใหม่!", "fields": fields[i:i + 10]}
+        for i in range(0, len(fields), 10)
+    ][:10]
+    data = {
+        "content": "@everyone รีบไปจองเลย! https://q.wildlifesanctuaryfca16.com/",
+        "username": "Slot Bot 🤖",
+        "embeds": embeds,
+    }
+
+    import requests
+
+    try:
+        # ใช้ json=data เพื่อให้ requests ส่ง Content-Type: application/json
+        _post_webhook(data, webhook_url)
+        logger.info("    🔔 Discord: Message sent successfully!")
+    except requests.exceptions.RequestException as e:
+        logger.error("    🔥 Discord Webhook Error: %s", e)
+        if hasattr(e, 'response') and e.response is not None and e.response.status_code == 404:
+            logger.error("    🔥 HINT: Webhook URL อาจจะไม่ถูกต้องหรือถูกลบไปแล้ว")
+# --- ⬆️ สิ้นสุดฟังก์ชัน Discord ⬆️ ---
+
+# วันอ้างอิงของ bitset — bit ที่ i ของ mask คือวันที่ EPOCH + i วัน
+EPOCH = date(2025, 1, 1)
+
+def date_to_bit(date_str):
+    """
+    แปลงวันที่ (YYYY-MM-DD) เป็นตำแหน่ง bit ใน notified mask
+    """
+    return (date.fromisoformat(date_str) - EPOCH).days
+
+def dates_to_mask(dates):
+    """
+    แปลงรายการวันที่เป็น int bitset
+    """
+    mask = 0
+    for date_str in dates:
+        mask |= 1 << date_to_bit(date_str)
+    return mask
+
+def mask_to_dates(mask):
+    """
+    แปลง int bitset กลับเป็นรายการวันที่ (เรียงตามลำดับ)
+    """
+    dates = []
+    i = 0
+    while mask >> i:
+        if (mask >> i) & 1:
+            dates.append((EPOCH + timedelta(days=i)).isoformat())
+        i += 1
+    return dates
+
+def load_notified_dates(filename="notified_dates.json"):
+    """
+    โหลด notified mask จากไฟล์ JSON (รองรับไฟล์รูปแบบเก่าที่เป็น list วันที่)
+    """
+    try:
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                data = orjson.loads(f.read())
+                if 'notified_mask' in data:
+                    return int(data['notified_mask'], 16)
+                # ไฟล์รูปแบบเก่า — แปลง list เป็น mask
+                return dates_to_mask(data.get('notified_dates', []))
+        return 0
+    except Exception as e:
+        logger.warning("⚠️ Error loading notified dates: %s", e)
+        return 0
+
+def save_notified_dates(notified_mask, filename="notified_dates.json"):
+    """
+    บันทึก notified mask ลงไฟล์ JSON (เก็บเป็น hex string สั้น ๆ)
+    """
+    try:
+        data = {
+            "last_updated": datetime.now().isoformat(),
+            "notified_mask": hex(notified_mask),
+            "notified_count": notified_mask.bit_count()
+        }
+        # เขียนลงไฟล์ .tmp ก่อนแล้วค่อย os.replace — ถ้า process ตายกลางคัน ไฟล์เดิมไม่พัง
+        tmp = filename + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        os.replace(tmp, filename)
+        logger.info("💾 Notified dates saved to %s", filename)
+    except Exception as e:
+        logger.warning("⚠️ Error saving notified dates: %s", e)
+
+def load_cache(filename="cache.json"):
+    """
+    โหลด cache ผลการเช็คต่อวันจากไฟล์ JSON ({date_str: {available, capacity, used, ts}})
+    """
+    try:
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                return orjson.loads(f.read())
+        return {}
+    except Exception as e:
+        logger.warning("⚠️ Error loading cache: %s", e)
+        return {}
+
+def save_cache(cache, filename="cache.json"):
+    """
+    บันทึก cache ผลการเช็คต่อวันลงไฟล์ JSON
+    """
+    try:
+        tmp = filename + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(orjson.dumps(cache, option=orjson.OPT_INDENT_2))
+        os.replace(tmp, filename)
+    except Exception as e:
+        logger.warning("⚠️ Error saving cache: %s", e)
+
+def cache_is_fresh(entry, now=None, ttl=None):
+    """
+    เช็คว่า cache entry ยังไม่หมดอายุ (default TTL = CACHE_TTL_SECONDS)
+    """
+    if now is None:
+        now = datetime.now()
+    if ttl is None:
+        ttl = CACHE_TTL_SECONDS
+    try:
+        age = (now - datetime.fromisoformat(entry["ts"])).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return False
+    return 0 <= age < ttl
+
+def make_session():
+    """
+    สร้าง aiohttp session พร้อม timeout และ connection pool ที่จำกัดไว้แล้ว
+    """
+    import aiohttp
+
+    return aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=30),
+        connector=aiohttp.TCPConnector(limit=MAX_CONCURRENCY, limit_per_host=MAX_CONCURRENCY),
+    )
+
+async def check_availability(start_date, end_date, discord_webhook_url, notified_mask, skip_dates=None, cache=None, session=None, skip_dates_sorted=None):
+    """
+    Check availability from API for date range and send Discord notification
+    if a new available date is found.
+
+    All dates are fetched concurrently through one aiohttp session instead of
+    one blocking request per date, so a 3-month window completes in roughly
+    one round-trip instead of minutes.
+
+    Args:
+        start_date: Starting date (YYYY-MM-DD)
+        end_date: Ending date (YYYY-MM-DD)
+        discord_webhook_url: Discord Webhook URL
+        notified_mask: Int bitset of dates already notified — bit i is the
+                       date EPOCH + i days (see date_to_bit).
+        skip_dates: A set of dates to skip checking (YYYY-MM-DD format)
+        cache: Per-date TTL cache dict (see load_cache). Fresh entries are
+               used instead of re-fetching; the dict is updated in-place.
+        session: An open aiohttp.ClientSession to reuse (daemon mode).
+                 If None, a session is created just for this call.
+        skip_dates_sorted: Pre-sorted skip dates for printing, so a daemon
+                           does not re-sort the same set every pass.
+
+    Returns:
+        (available_dates, notified_mask) — a list of all currently available
+        dates (for saving to JSON) and the updated notified bitset.
+    """
+    import aiohttp
+    from aiolimiter import AsyncLimiter
+    from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+    if skip_dates is None:
+        skip_dates = set()
+    if cache is None:
+        cache = {}
+
+    base_url = "https://q.wildlifesanctuaryfca16.com/api/v1/bookings/availability"
+
+    start_date_obj = date.fromisoformat(start_date)
+    end_date_obj = date.fromisoformat(end_date)
+
+    logger.info("🔍 Checking from %s to %s...", start_date, end_date)
+    if skip_dates:
+        logger.info("    ⏭️ Skipping %d dates", len(skip_dates))
+        if logger.isEnabledFor(logging.DEBUG):
+            if skip_dates_sorted is None:
+                skip_dates_sorted = tuple(sorted(skip_dates))
+            logger.debug("    ⏭️ Skip list: %s", list(skip_dates_sorted))
+
+    all_available_dates_this_run = []
+    new_slots = []
+
+    # สร้างรายการวันที่ที่ต้องเช็คครั้งเดียว — กรอง skip_dates ใน comprehension เดียว
+    num_days = (end_date_obj - start_date_obj).days + 1
+    dates = [
+        d for d in ((start_date_obj + timedelta(days=i)).isoformat() for i in range(num_days))
+        if d not in skip_dates
+    ]
+
+    # วันที่ที่ cache ยังสดอยู่ ไม่ต้องยิง API ซ้ำ
+    # วันที่ว่างและแจ้งไปแล้ว (state avail_notified) สถานะแทบไม่เปลี่ยน
+    # และแจ้งซ้ำไม่ได้อยู่ดี — ใช้ TTL ยาวกว่าปกติ
+    now = datetime.now()
+
+    def can_use_cache(date_str):
+        entry = cache.get(date_str)
+        if cache_is_fresh(entry, now):
+            return True
+        if entry and entry.get("state") == "avail_notified" and (notified_mask >> date_to_bit(date_str)) & 1:
+            return cache_is_fresh(entry, now, ttl=NOTIFIED_RECHECK_SECONDS)
+        return False
+
+    to_fetch = [d for d in dates if not can_use_cache(d)]
+    cached_count = len(dates) - len(to_fetch)
+    if cached_count:
+        logger.info("    ⚡ %d dates served from cache (TTL %ds)", cached_count, CACHE_TTL_SECONDS)
+
+    # ยิง request ทุกวันพร้อมกันผ่าน session เดียว
+    # semaphore คุมจำนวนพร้อมกัน, token bucket คุมอัตราต่อวินาที
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    limiter = AsyncLimiter(REQS_PER_SEC, 1)
+    # validator headers (ETag/Last-Modified) ของแต่ละวันที่ fetch ในรอบนี้
+    validators = {}
+
+    async def run_fetches(session):
+        @retry(
+            retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError)),
+            wait=wait_random_exponential(multiplier=0.5, max=30),
+            stop=stop_after_attempt(8),
+            reraise=True,
+        )
+        async def fetch(date_str):
+            async with limiter, sem:
+                # มี validator จากรอบก่อน → ขอแบบ conditional จะได้ 304 ถ้าไม่เปลี่ยน
+                entry = cache.get(date_str) or {}
+                headers = {}
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                    headers["Cache-Control"] = "max-age=0"
+                elif entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+                async with session.get(base_url, params={"date": date_str}, headers=headers) as response:
+                    if response.status == 304:
+                        # ไม่มีอะไรเปลี่ยนจากรอบก่อน — ใช้ค่าจาก cache ได้เลย
+                        validators[date_str] = {
+                            "etag": entry.get("etag"),
+                            "last_modified": entry.get("last_modified"),
+                        }
+                        return {"success": True, "data": entry}
+                    # โดน rate limit — รอตามที่ server บอกแล้วค่อย retry
+                    if response.status == 429:
+                        retry_after = response.headers.get("Retry-After")
+                        if retry_after:
+                            await asyncio.sleep(int(retry_after))
+                    response.raise_for_status()
+                    validators[date_str] = {
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+                    return orjson.loads(await response.read())
+
+        return await asyncio.gather(*(fetch(d) for d in to_fetch), return_exceptions=True)
+
+    if session is not None:
+        # ใช้ session ที่ caller เปิดค้างไว้ (โหมด daemon — connection pool อยู่ข้ามรอบ)
+        results = await run_fetches(session)
+    else:
+        async with make_session() as own_session:
+            results = await run_fetches(own_session)
+
+    # รวมผลจาก cache กับผลที่เพิ่ง fetch มา
+    fetched = set(to_fetch)
+    results_by_date = {d: {"success": True, "data": cache[d]} for d in dates if d not in fetched}
+    results_by_date.update(zip(to_fetch, results))
+
+    # แยกผลลัพธ์เป็นกลุ่ม ว่าง/เต็ม ก่อน แล้วค่อยทำ set algebra ทีเดียว
+    available_map = {}  # date_str -> (available, capacity)
+    full_map = {}       # date_str -> (used, capacity)
+    for date_str in dates:
+        result = results_by_date[date_str]
+        if isinstance(result, Exception):
+            logger.error("    ❌ %s - Error: %s", date_str, result)
+            continue
+
+        data = result
+
+        if data.get("success") and data.get("data"):
+            booking_data = data["data"]
+            available = booking_data.get("available", 0)
+            capacity = booking_data.get("capacity", 0)
+
+            # อัปเดต cache เฉพาะวันที่เพิ่ง fetch มาจริง (ไม่ต่ออายุ entry เก่า)
+            if date_str in fetched:
+                cache[date_str] = {
+                    "available": available,
+                    "capacity": capacity,
+                    "used": booking_data.get("used", 0),
+                    "ts": now.isoformat(),
+                    # วันว่างทุกวันจะถูกแจ้ง (หรือเคยแจ้งแล้ว) ภายในรอบนี้
+                    "state": "avail_notified" if available > 0 else "full",
+                    **validators.get(date_str, {}),
+                }
+
+            if available > 0:
+                available_map[date_str] = (available, capacity)
+            else:
+                full_map[date_str] = (booking_data.get("used", 0), capacity)
+        else:
+            logger.warning("    ⚠️  %s - No data available", date_str)
+
+    # bit algebra รอบเดียว แทนการ add/remove ทีละวัน — CPython จัดการ bigint ใน C
+    available_mask = dates_to_mask(available_map)
+    full_mask = dates_to_mask(full_map)
+    new_mask = available_mask & ~notified_mask
+    gone_mask = full_mask & notified_mask
+
+    # รายงานผลตามลำดับวันที่
+    for date_str in dates:
+        if date_str in available_map:
+            available, capacity = available_map[date_str]
+            all_available_dates_this_run.append({
+                "date": date_str,
+                "available": available,
+                "capacity": capacity,
+            })
+            if (new_mask >> date_to_bit(date_str)) & 1:
+                logger.info("    🎉 NEW SLOT FOUND! %s - %s slots", date_str, available)
+                # เก็บไว้ส่ง Discord ทีเดียวหลังจบรอบ
+                new_slots.append((date_str, available, capacity))
+            else:
+                logger.info("    ✅ %s - Still available: %s (Already notified)", date_str, available)
+        elif date_str in full_map:
+            used, capacity = full_map[date_str]
+            logger.info("    ❌ %s - FULL (%s/%s)", date_str, used, capacity)
+            if (gone_mask >> date_to_bit(date_str)) & 1:
+                logger.info("    ℹ️ %s is now full. Removed from notified list.", date_str)
+
+    notified_mask = (notified_mask | available_mask) & ~full_mask
+    new_dates_found_count = new_mask.bit_count()
+
+    if new_slots:
+        # ส่ง Discord ครั้งเดียว รวมทุกวันใหม่ในรอบนี้
+        send_discord_webhook(new_slots, discord_webhook_url)
+
+    if new_dates_found_count > 0:
+        logger.info("✨ Found and notified %d new dates in this run.", new_dates_found_count)
+    else:
+        logger.info("😔 No *new* available dates found in this run.")
+    
+    return all_available_dates_this_run, notified_mask
+
+def save_results(available, start_date, end_date, skip_dates, notified_mask):
+    """
+    บันทึกผลลัพธ์การตรวจสอบรอบล่าสุดลง available_dates.json
+    """
+    with open("available_dates.json.tmp", "wb") as f:
+        f.write(orjson.dumps({
+            "checked_at": datetime.now().isoformat(),
+            "date_range": {
+                "start": start_date,
+                "end": end_date
+            },
+            "skip_dates": list(skip_dates),
+            "available_dates_now": available,
+            "total_notified_dates": notified_mask.bit_count()
+        }, option=orjson.OPT_INDENT_2))
+    os.replace("available_dates.json.tmp", "available_dates.json")
+    logger.info("💾 Results updated to available_dates.json")
+
+async def main_loop(start_date, end_date, discord_webhook_url, notified_mask, skip_dates, cache):
+    """
+    รัน check_availability วนต่อเนื่องใน process เดียว (ถ้า POLL_INTERVAL > 0)
+    หรือรอบเดียวแล้วจบ (POLL_INTERVAL = 0, เหมาะกับ cron/GitHub Actions)
+
+    Session, cache และ notified mask อยู่ใน memory ข้ามรอบ — ไม่ต้องจ่าย
+    ค่า startup (import, TLS handshake, อ่านไฟล์) ใหม่ทุกรอบ
+    """
+    # รับ SIGINT/SIGTERM แล้วออกจาก loop อย่างเรียบร้อย (ยัง save ไฟล์ก่อนจบ)
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass  # บางแพลตฟอร์ม (Windows) ไม่รองรับ
+
+    # sort ครั้งเดียวต่อ process ไม่ใช่ทุกรอบ
+    skip_dates_sorted = tuple(sorted(skip_dates)) if skip_dates else ()
+
+    async with make_session() as session:
+        while True:
+            notified_before = notified_mask
+            cache_before = dict(cache)
+
+            available, notified_mask = await check_availability(
+                start_date,
+                end_date,
+                discord_webhook_url,
+                notified_mask,
+                skip_dates,
+                cache,
+                session,
+                skip_dates_sorted
+            )
+
+            # save เฉพาะตอนที่มีอะไรเปลี่ยนจริง (dirty flag)
+            # เขียนไฟล์ใน thread แยก — event loop ไม่ค้างระหว่างรอ disk
+            if notified_mask != notified_before:
+                await asyncio.to_thread(save_notified_dates, notified_mask)
+            if cache != cache_before:
+                await asyncio.to_thread(save_cache, cache)
+            await asyncio.to_thread(save_results, available, start_date, end_date, skip_dates, notified_mask)
+
+            if POLL_INTERVAL_SECONDS <= 0 or stop_event.is_set():
+                return available
+
+            # รอจนครบ interval หรือจนโดนสั่งหยุด
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+# --- ⬇️ ส่วนหลักของการรัน ⬇️ ---
+if __name__ == "__main__":
+
+    # ตั้งค่า logging ครั้งเดียว — ปรับระดับได้ผ่าน LOG_LEVEL (เช่น DEBUG/INFO/WARNING)
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="[%(asctime)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    # ==========================================================
+    # 🔐 ใช้ Environment Variable สำหรับ Webhook URL (สำหรับ GitHub Actions)
+    # ใน GitHub Actions จะตั้งค่าเป็น Secret
+    DISCORD_WEBHOOK_URL = os.getenv('DISCORD_WEBHOOK_URL', 'https://discord.com/api/webhooks/1436424986675122298/wJpkFF-6Wve2Awut51sFL7XmFqY0vTmIiHRjQ1PgJ9ZDrEhWat1RK8F78EfQuKEzNZKN')
+    # ==========================================================
+    
+    # ==========================================================
+    # 📅 วันที่ที่ต้องการข้าม (ไม่ต้องการตรวจสอบ)
+    # เพิ่มวันที่ในรูปแบบ "YYYY-MM-DD" ลงในลิสต์นี้
+    SKIP_DATES = {
+        "2025-11-19",  # วันที่ไม่สะดวก
+        "2025-11-26",
+        "2025-12-03",
+        "2025-12-10",
+        "2025-12-17",
+        "2025-12-24",
+        "2025-12-31",
+        "2026-01-07",
+        "2026-01-14",
+        "2026-01-21",
+        "2026-01-28",
+        "2026-02-04",
+        "2026-02-11",
+        "2026-02-13",
+        "2026-02-14",
+        "2026-02-15"
+    }
+    SKIP_DATES_SORTED = tuple(sorted(SKIP_DATES))
+    # ==========================================================
+
+    DISCORD_WEBHOOK_URL = DISCORD_WEBHOOK_URL.strip()
+    if not _WEBHOOK_RE.match(DISCORD_WEBHOOK_URL):
+        logger.error("=" * 80)
+        logger.error("🔥🔥🔥 ข้อผิดพลาด: กรุณาใส่ DISCORD_WEBHOOK_URL ของคุณในโค้ดก่อนรันสคริปต์")
+        logger.error("=" * 80)
+        exit(1)
+    
+    # โหลด notified mask และ cache ผลรอบก่อน
+    notified_mask = load_notified_dates()
+    cache = load_cache()
+    
+    logger.info("🚀 Starting availability check...")
+    logger.info("Webhook URL: ...%s", DISCORD_WEBHOOK_URL[-20:])
+    if SKIP_DATES:
+        logger.info("📅 Will skip these dates: %s", list(SKIP_DATES_SORTED))
+    
+    try:
+        start_date = "2025-11-15"
+        end_date = "2026-02-15"
+        
+        asyncio.run(main_loop(
+            start_date,
+            end_date,
+            DISCORD_WEBHOOK_URL,
+            notified_mask,
+            SKIP_DATES,
+            cache
+        ))
+
+        logger.info("✅ Check completed successfully!")
+
+    except KeyboardInterrupt:
+        logger.info("👋 Stopped by user.")
+    except Exception as e:
+        logger.exception("😱 An unexpected error occurred: %s", e)
         exit(1)
\ No newline at end of file